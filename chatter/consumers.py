@@ -1,55 +1,228 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import re
+from threading import Lock
+import time
 from typing import Optional
-from urllib.parse import parse_qs, unquote
+from urllib.parse import unquote_to_bytes
+from uuid import uuid4
 
-from channels.db import database_sync_to_async
+import orjson
+from channels.db import DatabaseSyncToAsync
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from django.db import connection, connections
 
 from chatter.models import Room, RoomAccessStatus, RoomParticipant, User
 
+# Number of seconds that a room's participants are cached for. Cached participants are
+# updated as soon as this process adds or removes a participant, and they are discarded
+# when another process broadcasts that it has done so. This only limits how stale the
+# list can get if one of those broadcasts is lost.
+PARTICIPANTS_CACHE_TIMEOUT = 5
 
-def extract_username(query_string: str) -> str:
+# Maps room IDs to tuples containing the time that the room's participants were cached
+# and the list of participants itself. Only participants are cached, since each
+# consumer keeps its own room's name and access type up to date.
+_participants_cache: dict[int, tuple[float, list[str]]] = {}
+
+# Maps room IDs to a number that changes whenever the room's participants change, so
+# that participants which were being retrieved at the time can be recognized as outdated
+# and not cached.
+_participants_versions: dict[int, int] = {}
+_next_participants_version = itertools.count()
+
+# Maps room IDs to the number of participants connected to this process. A room's cached
+# participants are discarded once its last local participant leaves, so that the cache
+# only holds rooms that this process is currently serving.
+_local_participant_counts: dict[int, int] = {}
+
+# Identifies this process in broadcasts about participants joining or leaving, so that
+# it can ignore its own broadcasts.
+_process_id = uuid4().hex
+
+# Longest room name that can be saved.
+ROOM_NAME_MAX_LENGTH = Room._meta.get_field("name").max_length
+
+# Matches room numbers generated by generate_room_number.
+ROOM_NUMBER_PATTERN = re.compile(r"[0-9]{10}")
+
+# Prevents cached participants and their versions from being changed by more than one
+# thread at once.
+_participants_cache_lock = Lock()
+
+# Database connections belonging to the threads in _database_executor, so that they can
+# be closed from outside of those threads (see close_executor_connections).
+_executor_connections = []
+
+
+def _register_executor_connections():
+    """
+    Records the database connections of a newly started executor thread.
+    """
+    _executor_connections.extend(connections.all())
+
+
+# Threads that database work is run on. Unlike the single thread that channels'
+# database_sync_to_async uses, this allows queries from different consumers to run at
+# the same time, and each thread keeps its own persistent database connection.
+_database_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_EXECUTOR_MAX_WORKERS,
+    thread_name_prefix="chatter-db",
+    initializer=_register_executor_connections,
+)
+
+
+def close_executor_connections():
+    """
+    Closes the database connections held open by the threads in
+    :py:data:`_database_executor`. Nothing else closes these connections while they are
+    still usable, so this has to be called before the database is dropped (such as at
+    the end of a test run). Should only be called while no database work is running.
+    """
+    for executor_connection in _executor_connections:
+        # Connections can only be closed by another thread if sharing is allowed.
+        executor_connection.inc_thread_sharing()
+        try:
+            executor_connection.close()
+        finally:
+            executor_connection.dec_thread_sharing()
+
+
+def database_sync_to_async(func):
+    """
+    Wraps sync function that accesses database so that it can be awaited. The function
+    will be run on one of the threads in :py:data:`_database_executor`.
+    """
+    return DatabaseSyncToAsync(
+        func, thread_sensitive=False, executor=_database_executor
+    )
+
+
+def extract_username(query_string: bytes) -> str:
     """
     Extracts username from query string (which would be used by an anonymous user to
     join with a specific username). Will return 'guest_' + the extracted username.
     """
+    # Query string is scanned directly instead of being fully parsed, since only the
+    # first guest parameter is needed.
+    if query_string.startswith(b"guest="):
+        start = len(b"guest=")
+    elif (index := query_string.find(b"&guest=")) != -1:
+        start = index + len(b"&guest=")
+    else:
+        return ""
+    end = query_string.find(b"&", start)
+    value = query_string[start:] if end == -1 else query_string[start:end]
     try:
-        found_username = parse_qs(unquote(query_string)).get("guest")[0]
-        return f"guest_{found_username}" if found_username else ""
-    except (TypeError, UnicodeError):
+        found_username = unquote_to_bytes(value.replace(b"+", b" ")).decode()
+    except UnicodeError:
         return ""
+    return f"guest_{found_username}" if found_username else ""
 
 
-@database_sync_to_async
-def get_access_status(room_number: str, user: User, username: str) -> RoomAccessStatus:
+def invalidate_participants(room: Room):
     """
-    Returns a :py:class:`RoomAccessStatus` instance determining whether or not a user
-    is allowed to join a room associated with a specific room number (if such a room
-    exists).
+    Discards any cached participants of room, including participants that are still
+    being retrieved.
     """
-    return Room.objects.get_access_status(room_number, user, username)
+    with _participants_cache_lock:
+        _participants_cache.pop(room.id, None)
+        _participants_versions[room.id] = next(_next_participants_version)
 
 
-@database_sync_to_async
-def is_owner(room: Room, user: User) -> bool:
+def count_local_participant(room: Room, joined: bool):
+    """
+    Records that a participant connected to this process has joined or left room. When
+    the last one leaves, room's cached participants are discarded. Only called from the
+    event loop, so the counts don't need a lock.
     """
-    Returns whether or not a user is the owner of a room.
+    count = _local_participant_counts.get(room.id, 0) + (1 if joined else -1)
+    if count > 0:
+        _local_participant_counts[room.id] = count
+    else:
+        _local_participant_counts.pop(room.id, None)
+        with _participants_cache_lock:
+            _participants_cache.pop(room.id, None)
+            # Participants still being retrieved won't find their version, so they won't
+            # be cached.
+            _participants_versions.pop(room.id, None)
+
+
+def update_cached_participants(room: Room, username: str, added: bool):
     """
-    return room.owner == user
+    Removes username from room's cached participants, if there are any, so that this
+    doesn't require retrieving the participants again. If username was added instead,
+    the cached participants are discarded.
+    """
+    with _participants_cache_lock:
+        # Version changes even if nothing is cached, since participants being retrieved
+        # may have been retrieved before this participant was added or removed.
+        _participants_versions[room.id] = next(_next_participants_version)
+        if not (cached := _participants_cache.get(room.id)):
+            return
+        # Participants are sorted by the database's collation, which Python can't
+        # reproduce, so there's no way to tell where an added participant belongs.
+        if added:
+            del _participants_cache[room.id]
+            return
+        # Removing a participant doesn't change the order of the others. Cached list
+        # may have been handed out already, so it's replaced instead of being modified.
+        # Time it was cached is kept so that it still expires.
+        participants = [
+            participant for participant in cached[1] if participant != username
+        ]
+        _participants_cache[room.id] = (cached[0], participants)
 
 
-@database_sync_to_async
 def add_participant(room: Room, username: str) -> bool:
     """
     Attempts to add record of participant to RoomParticipant. Will return True if added
     successfully. Will return False if existing recording was found.
     """
-    # Index 1 of tuple returned by get_or_create indicates whether or not object was
-    # created.
-    return RoomParticipant.objects.get_or_create(
-        room__id=room.id,
-        username=username,
-        defaults={"room": room, "username": username},
-    )[1]
+    # Relies on the room_username constraint so that a single INSERT can both add the
+    # participant and report whether or not one already existed.
+    # Names are quoted the same way the ORM would quote them.
+    quote_name = connection.ops.quote_name
+    opts = RoomParticipant._meta
+    table = quote_name(opts.db_table)
+    room_column = quote_name(opts.get_field("room").column)
+    username_column = quote_name(opts.get_field("username").column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({room_column}, {username_column}) "
+            "VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            [room.id, username],
+        )
+        added = cursor.rowcount == 1
+    if added:
+        update_cached_participants(room, username, True)
+    return added
+
+
+@database_sync_to_async
+def join_room(
+    room_number: str, user: User, username: str
+) -> tuple[Optional[Room], RoomAccessStatus, bool]:
+    """
+    Determines whether or not a user is allowed to join a room associated with a
+    specific room number and, if so, adds them as a participant. Returns tuple
+    containing the Room instance (or None), a :py:class:`RoomAccessStatus` instance,
+    and whether or not the user is the owner of the room.
+
+    Everything is done in a single call so that joining only requires one jump from
+    async to sync code.
+    """
+    room, access_status = Room.objects.get_access_status(room_number, user, username)
+    if access_status != RoomAccessStatus.ALLOWED:
+        return (room, access_status, False)
+    # The only write is a single INSERT whose conflicts are resolved by the
+    # room_username constraint, so neither a transaction nor a row lock is needed.
+    if not add_participant(room, username):
+        return (room, RoomAccessStatus.ALREADY_JOINED, False)
+    # Owner was fetched along with room, so no extra query is needed.
+    return (room, access_status, room.owner_id == user.id)
 
 
 @database_sync_to_async
@@ -59,11 +232,13 @@ def remove_participant(room: Room, username: str) -> bool:
     deleting objects from RoomParticipant and returning whether or not anything was
     deleted.
     """
-    # Index 0 of tuple returned by get_or_create indicates how many objects were
-    # deleted.
-    return bool(
+    # Index 0 of tuple returned by delete indicates how many objects were deleted.
+    removed = bool(
         RoomParticipant.objects.filter(room=room.id, username=username).delete()[0]
     )
+    if removed:
+        update_cached_participants(room, username, False)
+    return removed
 
 
 @database_sync_to_async
@@ -73,11 +248,26 @@ def ban_user(room: Room, user: User):
     """
     if user.is_authenticated:
         room.banned_users.add(user)
-        room.save()
 
 
 @database_sync_to_async
-def get_info_update(room: Room, kicked: Optional[list] = None) -> dict:
+def load_participants(room: Room) -> list[str]:
+    """
+    Retrieves room's participants (see :py:func:`get_participants`) and caches them,
+    unless they changed while being retrieved.
+    """
+    with _participants_cache_lock:
+        version = _participants_versions.setdefault(
+            room.id, next(_next_participants_version)
+        )
+    participants = get_participants(room)
+    with _participants_cache_lock:
+        if _participants_versions.get(room.id) == version:
+            _participants_cache[room.id] = (time.monotonic(), participants)
+    return participants
+
+
+async def get_info_update(room: Room, kicked: Optional[list] = None) -> dict:
     """
     Returns information about room that can be sent to client as update. This info
     includes room name, room access type, room owner, and a list of the room's
@@ -87,22 +277,32 @@ def get_info_update(room: Room, kicked: Optional[list] = None) -> dict:
     excluded from the list of participants. This is so that users who are supposed to
     have been kicked won't show up as participants, even if
     :py:func:`remove_participant` hasn't been called yet.
+
+    The room's owner is expected to have been fetched along with the room, and the
+    room's name and access type are kept up to date by the consumer's event handlers,
+    so the room itself isn't reloaded from the database. The participants are cached
+    for up to :py:data:`PARTICIPANTS_CACHE_TIMEOUT` seconds (see
+    :py:func:`invalidate_participants`).
     """
-    room.refresh_from_db()
-    update = {
+    # Cache is checked here so that cache hits don't require a jump to sync code.
+    cached = _participants_cache.get(room.id)
+    if cached and time.monotonic() - cached[0] < PARTICIPANTS_CACHE_TIMEOUT:
+        participants = cached[1]
+    else:
+        participants = await load_participants(room)
+
+    if kicked:
+        # Cached list is shared, so a filtered copy is made instead of modifying it.
+        participants = [
+            participant for participant in participants if participant not in kicked
+        ]
+    return {
         "update": "info",
         "name": room.name,
         "access type": room.access_type,
         "owner": room.owner.username,
-        "participants": get_participants(room),
+        "participants": participants,
     }
-    if kicked:
-        update["participants"] = [
-            participant
-            for participant in update["participants"]
-            if participant not in kicked
-        ]
-    return update
 
 
 def get_participants(room: Room) -> list[str]:
@@ -120,7 +320,7 @@ def change_room_name(room: Room, name: str):
     Changes room name.
     """
     room.name = name
-    room.save()
+    room.save(update_fields=["name"])
 
 
 @database_sync_to_async
@@ -130,18 +330,18 @@ def change_room_access_type(room: Room, access_type: str) -> list:
     result of the access type change.
     """
     room.access_type = access_type
-    room.save()
+    room.save(update_fields=["access_type"])
 
     if access_type == "CONFIRMED":
         guests = room.participants.filter(username__startswith="guest_")
         return list(guests.values_list("username", flat=True))
 
     elif access_type == "PRIVATE":
-        participants = list(room.participants.values_list("username", flat=True))
-        invited = list(room.invited_users.values_list("username", flat=True))
-        return [
-            participant for participant in participants if participant not in invited
-        ]
+        # Participants who aren't invited are found by the database in one query.
+        uninvited = room.participants.exclude(
+            username__in=room.invited_users.values("username")
+        )
+        return list(uninvited.values_list("username", flat=True))
 
     return []
 
@@ -151,6 +351,23 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
     Handles chatroom communication.
     """
 
+    # Whether or not user is currently a participant in room.
+    joined = False
+
+    @classmethod
+    async def decode_json(cls, text_data):
+        """
+        Decodes incoming JSON using orjson, which is faster than the json module.
+        """
+        return orjson.loads(text_data)
+
+    @classmethod
+    async def encode_json(cls, content):
+        """
+        Encodes outgoing JSON using orjson, which is faster than the json module.
+        """
+        return orjson.dumps(content).decode()
+
     async def connect(self):
         """
         Accepts user connections. If user isn't allowed to join room, a response will
@@ -158,36 +375,50 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         If the user is allowed to join, they will be sent a response containing their
         username for the room, and their channel will be added to the room's group.
         """
-        self.room_number = self.scope["url_route"]["kwargs"]["room_number"]
-        self.room_group_name = f"chat_{self.room_number}"
-        self.user = self.scope["user"]
+        # Values are looked up once and kept in locals since they are used repeatedly.
+        scope = self.scope
+        room_number = scope["url_route"]["kwargs"]["room_number"]
+        user = scope["user"]
 
         # Use guest username if user is not logged in.
-        self.username = (
-            self.user.username
-            if self.user.is_authenticated
-            else extract_username(self.scope["query_string"])
-        )
-        self.room, access_status = await get_access_status(
-            self.room_number, self.user, self.username
+        username = (
+            user.username
+            if user.is_authenticated
+            else extract_username(scope["query_string"])
         )
+
+        self.room_number = room_number
+        self.room_group_name = f"chat_{room_number}"
+        self.user = user
+        self.username = username
+        if ROOM_NUMBER_PATTERN.fullmatch(room_number):
+            self.room, access_status, self.is_owner = await join_room(
+                room_number, user, username
+            )
+        else:
+            # Room numbers are always 10 digits, so there's no need to check database.
+            self.room, access_status, self.is_owner = (
+                None,
+                RoomAccessStatus.NOT_FOUND,
+                False,
+            )
         if access_status == RoomAccessStatus.ALLOWED:
-            if await add_participant(self.room, self.username):
-                self.is_owner = await is_owner(self.room, self.user)
-                await self.accept()
-                await self.send_json(
-                    {
-                        "update": "joined successfully",
-                        "joined as": self.username,
-                    }
-                )
-                await self.channel_layer.group_add(
-                    self.room_group_name, self.channel_name
-                )
-            else:
-                await self.close(RoomAccessStatus.ALREADY_JOINED.value)
+            self.joined = True
+            count_local_participant(self.room, True)
+            await self.accept()
+            # Channel is added to group before the response is sent, so that the user
+            # receives every message sent to the room after they are told they joined.
+            await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+            await self.send_json(
+                {
+                    "update": "joined successfully",
+                    "joined as": username,
+                }
+            )
+            await self.send_participants_change()
         else:
-            await self.close(access_status.value)
+            # RoomAccessStatus is an IntEnum, so it can be used as close code as is.
+            await self.close(access_status)
 
     async def disconnect(self, code):
         """
@@ -196,70 +427,157 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
 
         This method might have to be called manually due to this bug:
         https://github.com/django/channels/issues/1466
+
+        Does nothing if user didn't join room or has already been removed. Otherwise,
+        calling this method again when the connection actually closes (or closing a
+        connection that was rejected because the user had already joined) would remove
+        the record of a participant that is still connected.
         """
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
-        await remove_participant(self.room, self.username)
+        if not self.joined:
+            return
+        self.joined = False
+        _, removed = await asyncio.gather(
+            self.channel_layer.group_discard(self.room_group_name, self.channel_name),
+            remove_participant(self.room, self.username),
+        )
+        count_local_participant(self.room, False)
+        if removed:
+            await self.send_participants_change()
+
+    async def send_participants_change(self):
+        """
+        Notifies room group that a participant joined or left, so that other processes
+        discard their cached participants of the room.
+        """
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {"type": "chat_participants_change", "process": _process_id},
+        )
 
     async def receive_json(self, content, **kwargs):
         """
         Performs actions as requested by the action key of the incoming JSON.
         """
         action = content.get("action")
+        # Action is checked first since unhashable values can't be looked up.
+        if isinstance(action, str) and (handler := self.actions.get(action)):
+            await handler(self, content)
+
+    async def action_send_message(self, content):
+        """
+        Sends chat message to room group.
+        """
+        # Update is encoded once here instead of once for every participant. There is
+        # no need to send to each channel in group separately, since the Redis channel
+        # layer delivers a group message to all of the group's channels with a single
+        # script per Redis server.
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                "type": "chat_message",
+                "payload": await self.encode_json(
+                    {
+                        "update": "new message",
+                        "message": str(content.get("message", "")),
+                        "username": self.username,
+                    }
+                ),
+            },
+        )
+
+    async def action_get_info(self, content):
+        """
+        Sends room info to client.
+        """
+        # pylint: disable=unused-argument
+        await self.send_json(await get_info_update(self.room))
+
+    async def action_change_room_name(self, content):
+        """
+        Changes room name and notifies room group of the change. Names that are blank
+        or too long to be saved are ignored.
+        """
+        new_name = str(content.get("name", ""))
+        if new_name.strip() and len(new_name) <= ROOM_NAME_MAX_LENGTH:
+            await change_room_name(self.room, new_name)
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {"type": "chat_room_name_change", "name": new_name},
+            )
 
-        if action == "send message":
+    async def action_change_room_access_type(self, content):
+        """
+        Changes room access type and notifies room group of the change, including which
+        users have to be kicked as a result.
+        """
+        if (access_type := content.get("access type")) in [
+            "PUBLIC",
+            "CONFIRMED",
+            "PRIVATE",
+        ]:
+            to_kick = await change_room_access_type(self.room, access_type)
+            # Room info is included so that it only has to be retrieved once.
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
-                    "type": "chat_message",
-                    "message": str(content.get("message", "")),
-                    "username": self.username,
+                    "type": "chat_access_type_change",
+                    "access type": access_type,
+                    "kick": to_kick,
+                    "info": await get_info_update(self.room, to_kick),
                 },
             )
 
-        elif action == "get info":
-            await self.send_json(await get_info_update(self.room))
-
-        elif action == "change room name":
-            if (new_name := str(content.get("name", ""))) and new_name.strip():
-                await change_room_name(self.room, content)
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {"type": "chat_room_name_change", "name": new_name},
-                )
-
-        elif action == "change room access type":
-            if (access_type := content.get("access type")) in [
-                "PUBLIC",
-                "CONFIRMED",
-                "PRIVATE",
-            ]:
-                to_kick = await change_room_access_type(self.room, access_type)
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        "type": "chat_access_type_change",
-                        "access type": access_type,
-                        "kick": ", ".join(to_kick),
-                    },
-                )
-
-        elif action == "kick user":
-            if self.is_owner and (username_to_kick := str(content.get("username"))):
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {"type": "chat_kick", "username": username_to_kick},
-                )
-
-        elif action == "ban user":
-            if (
-                self.is_owner
-                and (username_to_ban := str(content.get("username")))
-                and not username_to_ban.startswith("guest_")
-            ):
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {"type": "chat_ban", "username": username_to_ban},
-                )
+    async def action_kick_user(self, content):
+        """
+        Notifies room group that a user should be kicked, if requested by room owner.
+        """
+        username_to_kick = content.get("username")
+        if self.is_owner and isinstance(username_to_kick, str) and username_to_kick:
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    "type": "chat_kick",
+                    "username": username_to_kick,
+                    # Notice for other participants is encoded once here.
+                    "payload": await self.encode_json(
+                        {"update": "user kicked", "username": username_to_kick}
+                    ),
+                },
+            )
+
+    async def action_ban_user(self, content):
+        """
+        Notifies room group that a user should be banned, if requested by room owner.
+        Guest users cannot be banned.
+        """
+        username_to_ban = content.get("username")
+        if (
+            self.is_owner
+            and isinstance(username_to_ban, str)
+            and username_to_ban
+            and not username_to_ban.startswith("guest_")
+        ):
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    "type": "chat_ban",
+                    "username": username_to_ban,
+                    # Notice for other participants is encoded once here.
+                    "payload": await self.encode_json(
+                        {"update": "user banned", "username": username_to_ban}
+                    ),
+                },
+            )
+
+    # Maps values of the action key of incoming JSON to the methods that handle them.
+    actions = {
+        "send message": action_send_message,
+        "get info": action_get_info,
+        "change room name": action_change_room_name,
+        "change room access type": action_change_room_access_type,
+        "kick user": action_kick_user,
+        "ban user": action_ban_user,
+    }
 
     async def chat_info(self, event):
         """
@@ -272,28 +590,34 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         """
         Notifies client of room name change.
         """
+        self.room.name = event["name"]
         await self.send_json({"update": "name change", "name": event["name"]})
 
+    async def chat_participants_change(self, event):
+        """
+        Discards cached participants of room if a participant joined or left through
+        another process. This process updates its cache itself when it adds or removes
+        a participant.
+        """
+        if event["process"] != _process_id:
+            invalidate_participants(self.room)
+
     async def chat_message(self, event):
         """
         Receives new chat message from room group and sends it to client (along with
-        the username associated with the message).
+        the username associated with the message). The message has already been
+        encoded as JSON by the sender.
         """
-        await self.send_json(
-            {
-                "update": "new message",
-                "message": event["message"],
-                "username": event["username"],
-            }
-        )
+        await self.send(text_data=event["payload"])
 
     async def chat_access_type_change(self, event):
         """
         If user is affected by room access change, then user will be kicked. If not,
         then user will be notified of room access change, the number of users who
-        have been kicked, and the new room information.
+        have been kicked, and the new room information (all in a single message).
         """
-        to_kick = event["kick"].split(", ")
+        self.room.access_type = event["access type"]
+        to_kick = event["kick"]
         if self.username in to_kick:
             await self.disconnect(None)
             await self.send_json(
@@ -304,14 +628,15 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
                 True,
             )
         else:
+            # Room info is sent in the same message to avoid sending a second frame.
             await self.send_json(
                 {
                     "update": "users kicked because access change",
                     "access type": event["access type"],
                     "quantity": len(to_kick),
+                    "info": event["info"],
                 }
             )
-            await self.send_json(await get_info_update(self.room, to_kick))
 
     async def chat_kick(self, event):
         """
@@ -323,9 +648,7 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             await self.disconnect(None)
             await self.send_json({"update": "kicked you"}, True)
         else:
-            await self.send_json(
-                {"update": "user kicked", "username": event["username"]}
-            )
+            await self.send(text_data=event["payload"])
 
     async def chat_ban(self, event):
         """
@@ -334,10 +657,9 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         as participant. If not, just alert client that another user was banned.
         """
         if event["username"] == self.username:
-            await ban_user(self.room, self.user)
-            await self.disconnect(None)
+            # Ban is recorded before client is notified so that client can't rejoin
+            # before ban takes effect.
+            await asyncio.gather(ban_user(self.room, self.user), self.disconnect(None))
             await self.send_json({"update": "banned you"}, True)
         else:
-            await self.send_json(
-                {"update": "user banned", "username": event["username"]}
-            )
+            await self.send(text_data=event["payload"])
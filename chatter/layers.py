@@ -0,0 +1,24 @@
+import time
+
+from channels_redis.core import RedisChannelLayer
+
+
+class PipelinedRedisChannelLayer(RedisChannelLayer):
+    """
+    Redis channel layer that adds channels to groups using a single round trip to
+    Redis instead of two.
+    """
+
+    async def group_add(self, group, channel):
+        """
+        Adds the channel name to a group. The group's expiry time is set in the same
+        pipeline.
+        """
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        group_key = self._group_key(group)
+        async with self.connection(self.consistent_hash(group)) as connection:
+            pipeline = connection.pipeline()
+            pipeline.zadd(group_key, time.time(), channel)
+            pipeline.expire(group_key, self.group_expiry)
+            await pipeline.execute()
@@ -1,9 +1,8 @@
 from __future__ import annotations
 from enum import IntEnum
-import random
-import string
+import secrets
 from typing import Union
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -56,11 +55,16 @@ class User(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ["email"]
 
 
+# Number of times to try saving a new room with a randomly generated room number before
+# giving up.
+ROOM_NUMBER_ATTEMPTS = 3
+
+
 def generate_room_number():
     """
     Generates a room number composed of 10 digits.
     """
-    return "".join(random.sample(string.digits, 10))
+    return f"{secrets.randbelow(10 ** 10):010d}"
 
 
 class RoomAccessStatus(IntEnum):
@@ -90,8 +94,24 @@ class RoomManager(models.Manager):
         :py:class:`RoomAccessStatus` instance.
         """
         try:
-            room = self.prefetch_related("banned_users", "invited_users").get(
-                number=room_number
+            # Only the fields used by the chat consumer are retrieved, and whether or
+            # not user is banned or invited is determined in the same query.
+            room = (
+                self.select_related("owner")
+                .only("name", "number", "access_type", "owner__username")
+                .annotate(
+                    is_banned=models.Exists(
+                        User.objects.filter(
+                            banned_from=models.OuterRef("pk"), username=username
+                        )
+                    ),
+                    is_invited=models.Exists(
+                        User.objects.filter(
+                            invited_to=models.OuterRef("pk"), username=username
+                        )
+                    ),
+                )
+                .get(number=room_number)
             )
             if not user.is_authenticated:
                 validate_unicode_slug(username)
@@ -100,12 +120,9 @@ class RoomManager(models.Manager):
                 and not user.is_authenticated
             ):
                 return (room, RoomAccessStatus.CONFIRM_REQUIRED)
-            if room.banned_users.filter(username=username).exists():
+            if room.is_banned:
                 return (room, RoomAccessStatus.BANNED)
-            if (
-                room.access_type == Room.AccessTypes.PRIVATE
-                and not room.invited_users.filter(username=username).exists()
-            ):
+            if room.access_type == Room.AccessTypes.PRIVATE and not room.is_invited:
                 return (room, RoomAccessStatus.NOT_INVITED)
         except Room.DoesNotExist:
             return (None, RoomAccessStatus.NOT_FOUND)
@@ -152,11 +169,28 @@ class Room(models.Model):
         Saves Room object. Ensures that a random room number is generated if it doesn't
         exist.
         """
-        while not self.number:
-            number = generate_room_number()
-            if not Room.objects.filter(number=number):
-                self.number = number
-        super().save(*args, **kwargs)
+        if self.number:
+            super().save(*args, **kwargs)
+            return
+
+        # Instead of checking whether or not a room number is taken before saving, the
+        # unique constraint on number is relied on to reject numbers that are taken.
+        for attempt in range(ROOM_NUMBER_ATTEMPTS):
+            self.number = generate_room_number()
+            try:
+                # Savepoint prevents a failed attempt from breaking outer transaction.
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Only a room number that is already taken is retried, so anything else
+                # that violates a constraint (such as a missing owner) is raised at once.
+                if (
+                    attempt == ROOM_NUMBER_ATTEMPTS - 1
+                    or not Room.objects.filter(number=self.number).exists()
+                ):
+                    self.number = ""
+                    raise
 
 
 class RoomParticipant(models.Model):
@@ -1,25 +1,131 @@
 # from unittest import skip
+import asyncio
 
-from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.testing import WebsocketCommunicator
-from django.test import TransactionTestCase
-
-from chatter.models import Room, User
+from decouple import config
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from chatter.consumers import (
+    ROOM_NAME_MAX_LENGTH,
+    close_executor_connections,
+    extract_username,
+)
+from chatter.models import Room, RoomParticipant, User
 import chatter.routing
 
+# The tests put users into the scope themselves, so the application skips the auth
+# middleware and the session lookup it does on every connection.
 application = ProtocolTypeRouter(
-    {"websocket": AuthMiddlewareStack(URLRouter(chatter.routing.websocket_urlpatterns))}
+    {"websocket": URLRouter(chatter.routing.websocket_urlpatterns)}
 )
 
-TIMEOUT = 2
+# Seconds to wait for each message from the server. Can be raised when debugging.
+TIMEOUT = config("CHATTER_WS_TIMEOUT", cast=float, default=0.5)
+
+# The tests all run in one process, so they don't need Redis.
+IN_MEMORY_CHANNEL_LAYERS = {
+    "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+}
+
+# Apps whose tables need to be flushed after each chat test.
+CHAT_TEST_APPS = ["chatter", "django.contrib.auth", "django.contrib.contenttypes"]
+
+
+def make_communicator(url, user=None):
+    """
+    Creates a communicator that connects to the given URL as the given user, or as an
+    anonymous user when no user is given.
+    """
+    communicator = WebsocketCommunicator(application, url)
+    communicator.scope["user"] = AnonymousUser() if user is None else user
+    return communicator
+
+
+async def join(communicator):
+    """
+    Connects with the given communicator and returns the first message received. Fails
+    if the connection is rejected.
+    """
+    connected, code = await communicator.connect()
+    if not connected:
+        raise AssertionError(f"Connection was rejected with code {code}.")
+    return await communicator.receive_json_from(TIMEOUT)
+
+
+async def probe(url, user=None):
+    """
+    Attempts to join the room at the given URL as the given user (or as a guest when no
+    user is given) and returns the code the connection was rejected with. If the
+    connection is accepted, it is closed and None is returned.
+    """
+    communicator = make_communicator(url, user)
+    connected, code = await communicator.connect()
+    if connected:
+        await communicator.disconnect()
+        return None
+    return code
+
+
+class ExtractUsernameTests(SimpleTestCase):
+    """
+    Tests extracting guest usernames from query strings.
+    """
 
+    def test_extract_username(self):
+        """
+        Tests that the first guest parameter is extracted and decoded.
+        """
+        self.assertEqual("guest_test", extract_username(b"guest=test"))
+        self.assertEqual("guest_test", extract_username(b"other=1&guest=test&a=2"))
+        self.assertEqual("guest_test", extract_username(b"guest=test&guest=other"))
+        self.assertEqual("guest_test bad", extract_username(b"guest=test%20bad"))
+        self.assertEqual("guest_test bad", extract_username(b"guest=test+bad"))
+        self.assertEqual("guest_100%", extract_username(b"guest=100%25"))
 
+    def test_no_username(self):
+        """
+        Tests that a blank string is returned when there is no usable guest parameter.
+        """
+        self.assertEqual("", extract_username(b""))
+        self.assertEqual("", extract_username(b"guest="))
+        self.assertEqual("", extract_username(b"other=test"))
+        self.assertEqual("", extract_username(b"notguest=test"))
+        self.assertEqual("", extract_username(b"guest=%ff"))
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
 class ChatroomConnectionTests(TransactionTestCase):
     """
     Performs tests related to connecting and joining chat rooms.
     """
 
+    available_apps = CHAT_TEST_APPS
+
+    public_room_number = "1234567890"
+    public_room_websocket_url = f"/ws/chat/{public_room_number}/"
+    public_room_guest_websocket_url = f"{public_room_websocket_url}?guest=test"
+
+    confirmed_room_number = "2345678901"
+    confirmed_room_websocket_url = f"/ws/chat/{confirmed_room_number}/"
+    confirmed_room_guest_websocket_url = f"{confirmed_room_websocket_url}?guest=test"
+
+    private_room_number = "3456789012"
+    private_room_websocket_url = f"/ws/chat/{private_room_number}/"
+    private_room_guest_websocket_url = f"{private_room_websocket_url}?guest=test"
+
+    @classmethod
+    def tearDownClass(cls):
+        # The consumer's database threads keep their connections open, which would stop
+        # the test database from being dropped.
+        close_executor_connections()
+        super().tearDownClass()
+
     def setUp(self):
         """
         Sets up environment for tests. This includes three users (one room owner, an
@@ -28,187 +134,123 @@ class ChatroomConnectionTests(TransactionTestCase):
         room. The allowed user is not banned from any room, and they are invited to the
         private room.
         """
-        self.owner = User.objects.create_user("owner", "owner@example.com", "12345")
-
-        self.allowed_user = User.objects.create_user(
-            "allowed_user", "allowed@example.com", "12345"
+        # None of these tests log in, so the users are given unusable passwords rather
+        # than hashing one.
+        password = make_password(None)
+        self.owner = User(
+            username="owner", email="owner@example.com", password=password
         )
-
-        self.bad_user = User.objects.create_user(
-            "banned_user", "banned@example.com", "12345"
+        self.allowed_user = User(
+            username="allowed_user",
+            email="allowed@example.com",
+            password=password,
+        )
+        self.bad_user = User(
+            username="banned_user", email="banned@example.com", password=password
         )
 
-        self.public_room = Room.objects.create(
-            name="Room", number="1234567890", owner=self.owner
+        self.public_room = Room(
+            name="Room", number=self.public_room_number, owner=self.owner
         )
-        self.public_room_websocket_url = f"/ws/chat/{self.public_room.number}/"
-        self.public_room.banned_users.add(self.bad_user)
-        self.public_room.save()
 
-        self.confirmed_room = Room.objects.create(
+        self.confirmed_room = Room(
             name="Room",
-            number="2345678901",
+            number=self.confirmed_room_number,
             owner=self.owner,
             access_type=Room.AccessTypes.CONFIRMED,
         )
-        self.confirmed_room_websocket_url = f"/ws/chat/{self.confirmed_room.number}/"
-        self.confirmed_room.banned_users.add(self.bad_user)
-        self.confirmed_room.save()
 
-        self.private_room = Room.objects.create(
+        self.private_room = Room(
             name="Room",
-            number="3456789012",
+            number=self.private_room_number,
             owner=self.owner,
             access_type=Room.AccessTypes.PRIVATE,
         )
-        self.private_room_websocket_url = f"/ws/chat/{self.private_room.number}/"
-        self.private_room.invited_users.add(self.allowed_user)
-        self.private_room.save()
-
-    async def test_join_good_public(self):
-        """
-        Tests that users can join public rooms as long as they are not banned.
-        """
-        # Connect as allowed_user.
-        communicator = WebsocketCommunicator(
-            application, self.public_room_websocket_url
-        )
-        communicator.scope["user"] = self.allowed_user
-
-        connected = (await communicator.connect())[0]
-        self.assertTrue(connected)
-
-        response = await communicator.receive_json_from(TIMEOUT)
-        self.assertEqual(
-            {
-                "update": "joined successfully",
-                "joined as": self.allowed_user.username,
-            },
-            response,
-        )
-
-        # Connect as anonymous user.
-        communicator2 = WebsocketCommunicator(
-            application, f"{self.public_room_websocket_url}?guest=test"
-        )
-
-        connected = (await communicator2.connect())[0]
-        self.assertTrue(connected)
-
-        response = await communicator2.receive_json_from(TIMEOUT)
-        self.assertEqual(
-            {"update": "joined successfully", "joined as": "guest_test"},
-            response,
-        )
-
-    async def test_join_good_confirmed(self):
-        """
-        Tests that users can join confirmed rooms as long as they are not banned.
-        """
-        communicator = WebsocketCommunicator(
-            application, self.confirmed_room_websocket_url
-        )
-        communicator.scope["user"] = self.allowed_user
-
-        connected = (await communicator.connect())[0]
-        self.assertTrue(connected)
-
-        response = await communicator.receive_json_from(TIMEOUT)
-        self.assertEqual(
-            {
-                "update": "joined successfully",
-                "joined as": self.allowed_user.username,
-            },
-            response,
-        )
 
-    async def test_join_good_private(self):
-        """
-        Tests that users can join private rooms as long as they are invited.
-        """
-        communicator = WebsocketCommunicator(
-            application, self.private_room_websocket_url
-        )
-        communicator.scope["user"] = self.allowed_user
-
-        connected = (await communicator.connect())[0]
-        self.assertTrue(connected)
-
-        response = await communicator.receive_json_from(TIMEOUT)
-        self.assertEqual(
-            {
-                "update": "joined successfully",
-                "joined as": self.allowed_user.username,
-            },
-            response,
-        )
+        with transaction.atomic():
+            User.objects.bulk_create([self.owner, self.allowed_user, self.bad_user])
+            Room.objects.bulk_create(
+                [self.public_room, self.confirmed_room, self.private_room]
+            )
+            Room.banned_users.through.objects.bulk_create(
+                [
+                    Room.banned_users.through(
+                        room=self.public_room, user=self.bad_user
+                    ),
+                    Room.banned_users.through(
+                        room=self.confirmed_room, user=self.bad_user
+                    ),
+                ]
+            )
+            Room.invited_users.through.objects.create(
+                room=self.private_room, user=self.allowed_user
+            )
+
+    async def test_join_good(self):
+        """
+        Tests that users can join public and confirmed rooms as long as they are not
+        banned, that guests can join public rooms, and that users can join private
+        rooms as long as they are invited.
+        """
+        cases = [
+            (self.public_room_websocket_url, self.allowed_user, "allowed_user"),
+            (self.public_room_guest_websocket_url, None, "guest_test"),
+            (self.confirmed_room_websocket_url, self.allowed_user, "allowed_user"),
+            (self.private_room_websocket_url, self.allowed_user, "allowed_user"),
+        ]
+        responses = await asyncio.gather(
+            *(join(make_communicator(url, user)) for url, user, _ in cases)
+        )
+        for (url, _, username), response in zip(cases, responses):
+            with self.subTest(url=url, username=username):
+                self.assertEqual(
+                    {"update": "joined successfully", "joined as": username},
+                    response,
+                )
 
     async def test_join_not_found(self):
         """
         Tests that connection is closed with proper error message when a room has not
         been found.
         """
-        # Connect as allowed_user.
-        communicator = WebsocketCommunicator(application, "/ws/chat/54321/")
-        communicator.scope["user"] = self.allowed_user
-
-        connected, code = await communicator.connect()
-        self.assertEqual((False, 4001), (connected, code))
-
-        # Connect as anonymous user.
-        communicator2 = WebsocketCommunicator(application, "/ws/chat/54321/")
-
-        connected, code = await communicator2.connect()
-        self.assertEqual((False, 4001), (connected, code))
+        codes = await asyncio.gather(
+            # Connect as allowed_user.
+            probe("/ws/chat/54321/", self.allowed_user),
+            # Connect as anonymous user.
+            probe("/ws/chat/54321/"),
+            # Connect using room number that is valid but not associated with a room.
+            probe("/ws/chat/0987654321/", self.allowed_user),
+        )
+        self.assertEqual([4001, 4001, 4001], codes)
 
     async def test_join_bad_username(self):
         """
         Tests that connection is closed with proper error message when guest user has a
         bad username.
         """
-        # Username specified is space character.
-        communicator = WebsocketCommunicator(
-            application, f"{self.public_room_websocket_url}?guest=%20"
-        )
-
-        connected, code = await communicator.connect()
-        self.assertEqual((False, 4002), (connected, code))
-
-        # Username specified is blank.
-        communicator2 = WebsocketCommunicator(
-            application, f"{self.public_room_websocket_url}?guest="
-        )
-
-        connected, code = await communicator2.connect()
-        self.assertEqual((False, 4002), (connected, code))
-
-        # Username specified includes space character.
-        communicator3 = WebsocketCommunicator(
-            application, f"{self.public_room_websocket_url}?guest=test%20bad"
-        )
-
-        connected, code = await communicator3.connect()
-        self.assertEqual((False, 4002), (connected, code))
-
-        # No username is specified.
-        communicator4 = WebsocketCommunicator(
-            application, self.public_room_websocket_url
-        )
-
-        connected, code = await communicator4.connect()
-        self.assertEqual((False, 4002), (connected, code))
+        query_strings = [
+            # Username specified is space character.
+            "?guest=%20",
+            # Username specified is blank.
+            "?guest=",
+            # Username specified includes space character.
+            "?guest=test%20bad",
+            # No username is specified.
+            "",
+        ]
+        codes = await asyncio.gather(
+            *(probe(self.public_room_websocket_url + query) for query in query_strings)
+        )
+        for query_string, code in zip(query_strings, codes):
+            with self.subTest(query_string=query_string):
+                self.assertEqual(4002, code)
 
     async def test_join_confirm_required(self):
         """
         Tests that connection is closed with proper error message when a guest user
         tries to join a confirmed room.
         """
-        communicator = WebsocketCommunicator(
-            application, f"{self.confirmed_room_websocket_url}?guest=test"
-        )
-
-        connected, code = await communicator.connect()
-        self.assertEqual((False, 4003), (connected, code))
+        self.assertEqual(4003, await probe(self.confirmed_room_guest_websocket_url))
 
     async def test_join_not_invited(self):
         """
@@ -217,45 +259,26 @@ class ChatroomConnectionTests(TransactionTestCase):
         guest users will receive same error message when they try to join private
         rooms.
         """
-        # Connect as allowed_user.
-        communicator = WebsocketCommunicator(
-            application, self.private_room_websocket_url
+        codes = await asyncio.gather(
+            # Connect as bad_user.
+            probe(self.private_room_websocket_url, self.bad_user),
+            # Connect as anonymous user.
+            probe(self.private_room_guest_websocket_url),
         )
-        communicator.scope["user"] = self.bad_user
-
-        connected, code = await communicator.connect()
-        self.assertEqual((False, 4004), (connected, code))
-
-        # Connect as anonymous user.
-        communicator2 = WebsocketCommunicator(
-            application, f"{self.private_room_websocket_url}?guest=test"
-        )
-
-        connected, code = await communicator2.connect()
-        self.assertEqual((False, 4004), (connected, code))
+        self.assertEqual([4004, 4004], codes)
 
     async def test_join_banned(self):
         """
         Tests that connection is closed with proper error message when user is banned
         from room.
         """
-        # Attempting to join public room.
-        communicator = WebsocketCommunicator(
-            application, self.public_room_websocket_url
-        )
-        communicator.scope["user"] = self.bad_user
-
-        connected, code = await communicator.connect()
-        self.assertEqual((False, 4005), (connected, code))
-
-        # Attempting to join confirmed room.
-        communicator2 = WebsocketCommunicator(
-            application, self.confirmed_room_websocket_url
+        codes = await asyncio.gather(
+            # Attempting to join public room.
+            probe(self.public_room_websocket_url, self.bad_user),
+            # Attempting to join confirmed room.
+            probe(self.confirmed_room_websocket_url, self.bad_user),
         )
-        communicator2.scope["user"] = self.bad_user
-
-        connected, code = await communicator2.connect()
-        self.assertEqual((False, 4005), (connected, code))
+        self.assertEqual([4005, 4005], codes)
 
     async def test_join_already_in_room(self):
         """
@@ -264,15 +287,11 @@ class ChatroomConnectionTests(TransactionTestCase):
         another guest participant.
         """
         # Connect as self.allowed_user.
-        communicator = WebsocketCommunicator(
-            application, self.public_room_websocket_url
+        communicator = make_communicator(
+            self.public_room_websocket_url, self.allowed_user
         )
-        communicator.scope["user"] = self.allowed_user
 
-        connected = (await communicator.connect())[0]
-        self.assertTrue(connected)
-
-        response = await communicator.receive_json_from(TIMEOUT)
+        response = await join(communicator)
         self.assertEqual(
             {
                 "update": "joined successfully",
@@ -282,23 +301,26 @@ class ChatroomConnectionTests(TransactionTestCase):
         )
 
         # Attempt to join while original connection is still active.
-        communicator2 = WebsocketCommunicator(
-            application, self.public_room_websocket_url
+        communicator2 = make_communicator(
+            self.public_room_websocket_url, self.allowed_user
         )
-        communicator2.scope["user"] = self.allowed_user
 
         connected, code = await communicator2.connect()
         self.assertEqual((False, 4006), (connected, code))
 
-        # Connect as anonymous user.
-        communicator3 = WebsocketCommunicator(
-            application, f"{self.public_room_websocket_url}?guest=test"
+        # Closing rejected connection doesn't remove original participant.
+        await communicator2.disconnect()
+        communicator2 = make_communicator(
+            self.public_room_websocket_url, self.allowed_user
         )
 
-        connected = (await communicator3.connect())[0]
-        self.assertTrue(connected)
+        connected, code = await communicator2.connect()
+        self.assertEqual((False, 4006), (connected, code))
+
+        # Connect as anonymous user.
+        communicator3 = make_communicator(self.public_room_guest_websocket_url)
 
-        response = await communicator3.receive_json_from(TIMEOUT)
+        response = await join(communicator3)
         self.assertEqual(
             {
                 "update": "joined successfully",
@@ -308,9 +330,7 @@ class ChatroomConnectionTests(TransactionTestCase):
         )
 
         # Attempt to join while original connection is still active.
-        communicator4 = WebsocketCommunicator(
-            application, f"{self.public_room_websocket_url}?guest=test"
-        )
+        communicator4 = make_communicator(self.public_room_guest_websocket_url)
 
         connected, code = await communicator4.connect()
         self.assertEqual((False, 4006), (connected, code))
@@ -322,15 +342,11 @@ class ChatroomConnectionTests(TransactionTestCase):
         assuming no one else joined using the same guest username.
         """
         # Connect as self.allowed_user.
-        communicator = WebsocketCommunicator(
-            application, self.public_room_websocket_url
+        communicator = make_communicator(
+            self.public_room_websocket_url, self.allowed_user
         )
-        communicator.scope["user"] = self.allowed_user
-
-        connected = (await communicator.connect())[0]
-        self.assertTrue(connected)
 
-        response = await communicator.receive_json_from(TIMEOUT)
+        response = await join(communicator)
         self.assertEqual(
             {
                 "update": "joined successfully",
@@ -342,15 +358,11 @@ class ChatroomConnectionTests(TransactionTestCase):
         await communicator.disconnect()
 
         # Rejoin.
-        communicator2 = WebsocketCommunicator(
-            application, self.public_room_websocket_url
+        communicator2 = make_communicator(
+            self.public_room_websocket_url, self.allowed_user
         )
-        communicator2.scope["user"] = self.allowed_user
 
-        connected = (await communicator2.connect())[0]
-        self.assertTrue(connected)
-
-        response = await communicator2.receive_json_from(TIMEOUT)
+        response = await join(communicator2)
         self.assertEqual(
             {
                 "update": "joined successfully",
@@ -360,14 +372,9 @@ class ChatroomConnectionTests(TransactionTestCase):
         )
 
         # Connect as anonymous user.
-        communicator3 = WebsocketCommunicator(
-            application, f"{self.public_room_websocket_url}?guest=test"
-        )
+        communicator3 = make_communicator(self.public_room_guest_websocket_url)
 
-        connected = (await communicator3.connect())[0]
-        self.assertTrue(connected)
-
-        response = await communicator3.receive_json_from(TIMEOUT)
+        response = await join(communicator3)
         self.assertEqual(
             {
                 "update": "joined successfully",
@@ -379,14 +386,9 @@ class ChatroomConnectionTests(TransactionTestCase):
         await communicator3.disconnect()
 
         # Rejoin.
-        communicator4 = WebsocketCommunicator(
-            application, f"{self.public_room_websocket_url}?guest=test"
-        )
+        communicator4 = make_communicator(self.public_room_guest_websocket_url)
 
-        connected = (await communicator4.connect())[0]
-        self.assertTrue(connected)
-
-        response = await communicator4.receive_json_from(TIMEOUT)
+        response = await join(communicator4)
         self.assertEqual(
             {
                 "update": "joined successfully",
@@ -396,41 +398,51 @@ class ChatroomConnectionTests(TransactionTestCase):
         )
 
 
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
 class ChatroomActionTests(TransactionTestCase):
     """
     Performs tests related to requesting actions from server.
     """
 
+    available_apps = CHAT_TEST_APPS
+
+    room_number = "1234567890"
+    room_websocket_url = f"/ws/chat/{room_number}/"
+    room_guest_websocket_url = f"{room_websocket_url}?guest=test"
+
+    @classmethod
+    def tearDownClass(cls):
+        # The consumer's database threads keep their connections open, which would stop
+        # the test database from being dropped.
+        close_executor_connections()
+        super().tearDownClass()
+
     def setUp(self):
         """
         Sets up environment for tests. Creates two users (one room owner and one normal
         user). A public room is also created.
         """
-        self.owner = User.objects.create_user("owner", "owner@example.com", "12345")
+        password = make_password(None)
+        self.owner = User(
+            username="owner", email="owner@example.com", password=password
+        )
+        self.user = User(username="user", email="user@example.com", password=password)
 
-        self.user = User.objects.create_user("user", "user@example.com", "12345")
+        self.room = Room(name="Room", number=self.room_number, owner=self.owner)
 
-        self.room = Room.objects.create(
-            name="Room", number="1234567890", owner=self.owner
-        )
-        self.room_websocket_url = f"/ws/chat/{self.room.number}/"
-        self.room.invited_users.add(self.owner)
-        self.room.save()
+        with transaction.atomic():
+            User.objects.bulk_create([self.owner, self.user])
+            Room.objects.bulk_create([self.room])
+            Room.invited_users.through.objects.create(room=self.room, user=self.owner)
 
     async def test_get_info(self):
         """
         Tests getting room participants.
         """
-        # Connect owner as room participant.
-        owner_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        owner_communicator.scope["user"] = self.owner
-        await owner_communicator.connect()
-
-        # Connect normal user as room participant.
-        user_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator.scope["user"] = self.user
-        await user_communicator.connect()
-        await user_communicator.receive_json_from(TIMEOUT)
+        # Connect owner and normal user as room participants.
+        owner_communicator = make_communicator(self.room_websocket_url, self.owner)
+        user_communicator = make_communicator(self.room_websocket_url, self.user)
+        await asyncio.gather(join(owner_communicator), join(user_communicator))
 
         await user_communicator.send_json_to({"action": "get info"})
         response = await user_communicator.receive_json_from(TIMEOUT)
@@ -445,21 +457,38 @@ class ChatroomActionTests(TransactionTestCase):
             response,
         )
 
+    async def test_get_info_after_join_elsewhere(self):
+        """
+        Tests that participants who joined through another process are included in
+        room info, even if the room's participants were already cached.
+        """
+        communicator = make_communicator(self.room_websocket_url, self.owner)
+        await join(communicator)
+        await communicator.send_json_to({"action": "get info"})
+        await communicator.receive_json_from(TIMEOUT)
+
+        # Another process adds a participant and broadcasts that it did so.
+        await database_sync_to_async(RoomParticipant.objects.create)(
+            room=self.room, username="user"
+        )
+        await get_channel_layer().group_send(
+            f"chat_{self.room_number}",
+            {"type": "chat_participants_change", "process": "other"},
+        )
+        self.assertTrue(await communicator.receive_nothing(TIMEOUT))
+
+        await communicator.send_json_to({"action": "get info"})
+        response = await communicator.receive_json_from(TIMEOUT)
+        self.assertEqual(["owner", "user"], response["participants"])
+
     async def test_change_room_name(self):
         """
         Tests changing room name.
         """
-        # Connect owner as room participant.
-        owner_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        owner_communicator.scope["user"] = self.owner
-        await owner_communicator.connect()
-        await owner_communicator.receive_json_from(TIMEOUT)
-
-        # Connect normal user as room participant.
-        user_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator.scope["user"] = self.user
-        await user_communicator.connect()
-        await user_communicator.receive_json_from(TIMEOUT)
+        # Connect owner and normal user as room participants.
+        owner_communicator = make_communicator(self.room_websocket_url, self.owner)
+        user_communicator = make_communicator(self.room_websocket_url, self.user)
+        await asyncio.gather(join(owner_communicator), join(user_communicator))
 
         # Owner requests that room name is changed.
         await owner_communicator.send_json_to(
@@ -474,6 +503,23 @@ class ChatroomActionTests(TransactionTestCase):
         response = await user_communicator.receive_json_from(TIMEOUT)
         self.assertEqual({"update": "name change", "name": "New Name"}, response)
 
+    async def test_change_room_name_too_long(self):
+        """
+        Tests that room names longer than the room's name field allows are ignored.
+        """
+        communicator = make_communicator(self.room_websocket_url, self.owner)
+        await join(communicator)
+
+        await communicator.send_json_to(
+            {"action": "change room name", "name": "a" * (ROOM_NAME_MAX_LENGTH + 1)}
+        )
+
+        # Name is unchanged, and the next message received is the requested info.
+        await communicator.send_json_to({"action": "get info"})
+        response = await communicator.receive_json_from(TIMEOUT)
+        self.assertEqual("info", response["update"])
+        self.assertEqual("Room", response["name"])
+
     async def test_send_new_messages(self):
         """
         Tests that all room participants will receive a chat message sent by one
@@ -485,17 +531,10 @@ class ChatroomActionTests(TransactionTestCase):
             "username": self.user.username,
         }
 
-        # Connect owner as room participant.
-        owner_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        owner_communicator.scope["user"] = self.owner
-        await owner_communicator.connect()
-        await owner_communicator.receive_json_from(TIMEOUT)
-
-        # Connect normal user as room participant.
-        user_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator.scope["user"] = self.user
-        await user_communicator.connect()
-        await user_communicator.receive_json_from(TIMEOUT)
+        # Connect owner and normal user as room participants.
+        owner_communicator = make_communicator(self.room_websocket_url, self.owner)
+        user_communicator = make_communicator(self.room_websocket_url, self.user)
+        await asyncio.gather(join(owner_communicator), join(user_communicator))
 
         # Normal user sends message.
         await user_communicator.send_json_to(
@@ -515,24 +554,15 @@ class ChatroomActionTests(TransactionTestCase):
         changed to CONFIRMED. Also tests that remaining users receive info related to
         access type change, including the number of users that have been kicked.
         """
-        # Connect owner as room participant.
-        owner_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        owner_communicator.scope["user"] = self.owner
-        await owner_communicator.connect()
-        await owner_communicator.receive_json_from(TIMEOUT)
-
-        # Connect normal user as room participant.
-        user_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator.scope["user"] = self.user
-        await user_communicator.connect()
-        await user_communicator.receive_json_from(TIMEOUT)
-
-        # Connect anonymous user as room participant.
-        guest_communicator = WebsocketCommunicator(
-            application, f"{self.room_websocket_url}?guest=test"
+        # Connect owner, normal user, and anonymous user as room participants.
+        owner_communicator = make_communicator(self.room_websocket_url, self.owner)
+        user_communicator = make_communicator(self.room_websocket_url, self.user)
+        guest_communicator = make_communicator(self.room_guest_websocket_url)
+        await asyncio.gather(
+            join(owner_communicator),
+            join(user_communicator),
+            join(guest_communicator),
         )
-        await guest_communicator.connect()
-        await guest_communicator.receive_json_from(TIMEOUT)
 
         # Owner changes room access type to CONFIRMED, kicking out anonymous user.
         await owner_communicator.send_json_to(
@@ -554,17 +584,13 @@ class ChatroomActionTests(TransactionTestCase):
                 "update": "users kicked because access change",
                 "access type": "CONFIRMED",
                 "quantity": 1,
-            },
-            response,
-        )
-        response = await owner_communicator.receive_json_from(TIMEOUT)
-        self.assertEqual(
-            {
-                "update": "info",
-                "name": "Room",
-                "access type": "CONFIRMED",
-                "owner": "owner",
-                "participants": ["owner", "user"],
+                "info": {
+                    "update": "info",
+                    "name": "Room",
+                    "access type": "CONFIRMED",
+                    "owner": "owner",
+                    "participants": ["owner", "user"],
+                },
             },
             response,
         )
@@ -580,17 +606,13 @@ class ChatroomActionTests(TransactionTestCase):
                 "update": "users kicked because access change",
                 "access type": "CONFIRMED",
                 "quantity": 1,
-            },
-            response,
-        )
-        response = await user_communicator.receive_json_from(TIMEOUT)
-        self.assertEqual(
-            {
-                "update": "info",
-                "name": "Room",
-                "access type": "CONFIRMED",
-                "owner": "owner",
-                "participants": ["owner", "user"],
+                "info": {
+                    "update": "info",
+                    "name": "Room",
+                    "access type": "CONFIRMED",
+                    "owner": "owner",
+                    "participants": ["owner", "user"],
+                },
             },
             response,
         )
@@ -600,9 +622,7 @@ class ChatroomActionTests(TransactionTestCase):
         )
 
         # Anonymous user cannot rejoin.
-        guest_communicator2 = WebsocketCommunicator(
-            application, f"{self.room_websocket_url}?guest=test"
-        )
+        guest_communicator2 = make_communicator(self.room_guest_websocket_url)
         connected, code = await guest_communicator2.connect()
         self.assertEqual((False, 4003), (connected, code))
 
@@ -613,23 +633,18 @@ class ChatroomActionTests(TransactionTestCase):
         access type change, including the number of users that have been kicked.
         """
         # Connect owner as room participant.
-        owner_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        owner_communicator.scope["user"] = self.owner
-        await owner_communicator.connect()
-        await owner_communicator.receive_json_from(TIMEOUT)
+        owner_communicator = make_communicator(self.room_websocket_url, self.owner)
+        await join(owner_communicator)
 
         # Owner changes room access type to CONFIRMED.
         await owner_communicator.send_json_to(
             {"action": "change room access type", "access type": "CONFIRMED"}
         )
         await owner_communicator.receive_json_from(TIMEOUT)
-        await owner_communicator.receive_json_from(TIMEOUT)
 
         # Connect normal user as room participant.
-        user_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator.scope["user"] = self.user
-        await user_communicator.connect()
-        await user_communicator.receive_json_from(TIMEOUT)
+        user_communicator = make_communicator(self.room_websocket_url, self.user)
+        await join(user_communicator)
 
         # Owner changes room access type to PRIVATE, kicking out normal user.
         await owner_communicator.send_json_to(
@@ -651,24 +666,19 @@ class ChatroomActionTests(TransactionTestCase):
                 "update": "users kicked because access change",
                 "access type": "PRIVATE",
                 "quantity": 1,
-            },
-            response,
-        )
-        response = await owner_communicator.receive_json_from(TIMEOUT)
-        self.assertEqual(
-            {
-                "update": "info",
-                "name": "Room",
-                "access type": "PRIVATE",
-                "owner": "owner",
-                "participants": ["owner"],
+                "info": {
+                    "update": "info",
+                    "name": "Room",
+                    "access type": "PRIVATE",
+                    "owner": "owner",
+                    "participants": ["owner"],
+                },
             },
             response,
         )
 
         # Normal user cannot rejoin.
-        user_communicator2 = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator2.scope["user"] = self.user
+        user_communicator2 = make_communicator(self.room_websocket_url, self.user)
         connected, code = await user_communicator2.connect()
         self.assertEqual((False, 4004), (connected, code))
 
@@ -676,17 +686,10 @@ class ChatroomActionTests(TransactionTestCase):
         """
         Tests that a room participant can be kicked by room owner.
         """
-        # Connect owner as room participant.
-        owner_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        owner_communicator.scope["user"] = self.owner
-        await owner_communicator.connect()
-        await owner_communicator.receive_json_from(TIMEOUT)
-
-        # Connect normal user as room participant.
-        user_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator.scope["user"] = self.user
-        await user_communicator.connect()
-        await user_communicator.receive_json_from(TIMEOUT)
+        # Connect owner and normal user as room participants.
+        owner_communicator = make_communicator(self.room_websocket_url, self.owner)
+        user_communicator = make_communicator(self.room_websocket_url, self.user)
+        await asyncio.gather(join(owner_communicator), join(user_communicator))
 
         # Owner requests that normal user is kicked.
         await owner_communicator.send_json_to(
@@ -704,10 +707,8 @@ class ChatroomActionTests(TransactionTestCase):
         )
 
         # Normal user rejoins.
-        user_communicator2 = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator2.scope["user"] = self.user
-        await user_communicator2.connect()
-        response = await user_communicator2.receive_json_from(TIMEOUT)
+        user_communicator2 = make_communicator(self.room_websocket_url, self.user)
+        response = await join(user_communicator2)
         self.assertEqual(
             {
                 "update": "joined successfully",
@@ -717,11 +718,8 @@ class ChatroomActionTests(TransactionTestCase):
         )
 
         # Connect anonymous user as room participant.
-        guest_communicator = WebsocketCommunicator(
-            application, f"{self.room_websocket_url}?guest=test"
-        )
-        await guest_communicator.connect()
-        await guest_communicator.receive_json_from(TIMEOUT)
+        guest_communicator = make_communicator(self.room_guest_websocket_url)
+        await join(guest_communicator)
 
         # Owner requests that anonymous user is kicked.
         await owner_communicator.send_json_to(
@@ -737,11 +735,8 @@ class ChatroomActionTests(TransactionTestCase):
         self.assertEqual({"update": "user kicked", "username": "guest_test"}, response)
 
         # Anonymous user rejoins.
-        guest_communicator2 = WebsocketCommunicator(
-            application, f"{self.room_websocket_url}?guest=test"
-        )
-        await guest_communicator2.connect()
-        response = await guest_communicator2.receive_json_from(TIMEOUT)
+        guest_communicator2 = make_communicator(self.room_guest_websocket_url)
+        response = await join(guest_communicator2)
         self.assertEqual(
             {
                 "update": "joined successfully",
@@ -755,17 +750,10 @@ class ChatroomActionTests(TransactionTestCase):
         Tests that a room participant can be banned by room owner. Also tests that this
         does not apply to guest users.
         """
-        # Connect owner as room participant.
-        owner_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        owner_communicator.scope["user"] = self.owner
-        await owner_communicator.connect()
-        await owner_communicator.receive_json_from(TIMEOUT)
-
-        # Connect normal user as room participant.
-        user_communicator = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator.scope["user"] = self.user
-        await user_communicator.connect()
-        await user_communicator.receive_json_from(TIMEOUT)
+        # Connect owner and normal user as room participants.
+        owner_communicator = make_communicator(self.room_websocket_url, self.owner)
+        user_communicator = make_communicator(self.room_websocket_url, self.user)
+        await asyncio.gather(join(owner_communicator), join(user_communicator))
 
         # Owner requests that normal user is banned.
         await owner_communicator.send_json_to(
@@ -783,17 +771,13 @@ class ChatroomActionTests(TransactionTestCase):
         )
 
         # Normal user cannot rejoin.
-        user_communicator2 = WebsocketCommunicator(application, self.room_websocket_url)
-        user_communicator2.scope["user"] = self.user
+        user_communicator2 = make_communicator(self.room_websocket_url, self.user)
         connected, code = await user_communicator2.connect()
         self.assertEqual((False, 4005), (connected, code))
 
         # Connect anonymous user as room participant.
-        guest_communicator = WebsocketCommunicator(
-            application, f"{self.room_websocket_url}?guest=test"
-        )
-        await guest_communicator.connect()
-        await guest_communicator.receive_json_from(TIMEOUT)
+        guest_communicator = make_communicator(self.room_guest_websocket_url)
+        await join(guest_communicator)
 
         # Owner requests that anonymous user is banned. Request will be ignored.
         await owner_communicator.send_json_to(
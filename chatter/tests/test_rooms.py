@@ -1,12 +1,16 @@
+from unittest import mock
+
 from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError
 from django.test import TestCase
 
 from chatter.models import Room, RoomAccessStatus, User
 
 
 class RoomCreationTests(TestCase):
-    def setUp(self):
-        self.owner = User.objects.create_user("owner", "owner@example.com", "12345")
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com")
 
     def test_create_room(self):
         """
@@ -16,63 +20,107 @@ class RoomCreationTests(TestCase):
         self.assertEqual(len(room.number), 10)
         self.assertEqual(room.access_type, "PUBLIC")
 
+    def test_room_number_taken(self):
+        """
+        Tests that a new room number is generated if the first one is already taken.
+        """
+        taken = Room.objects.create(name="Taken", owner=self.owner).number
+        with mock.patch(
+            "chatter.models.generate_room_number", side_effect=[taken, "0123456789"]
+        ):
+            room = Room.objects.create(name="Room", owner=self.owner)
+        self.assertEqual(room.number, "0123456789")
+
+    def test_other_integrity_error(self):
+        """
+        Tests that errors which aren't caused by a room number that is already taken
+        aren't retried.
+        """
+        with mock.patch(
+            "chatter.models.generate_room_number", return_value="0123456789"
+        ) as generate_room_number, self.assertRaises(IntegrityError):
+            Room.objects.create(name="Room")
+        self.assertEqual(generate_room_number.call_count, 1)
+
 
 class RoomAccessTests(TestCase):
     """
     Tests the RoomManager.get_access_status method.
     """
 
-    def setUp(self):
-        self.owner = User.objects.create_user("owner", "owner@example.com", "12345")
-        self.room = Room.objects.create(
-            name="Room", number="1234567890", owner=self.owner
-        )
-        self.other_user = User.objects.create_user("test", "test@example.com", "12345")
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com")
+        cls.other_user = User.objects.create_user("test", "test@example.com")
+        cls.banned_user = User.objects.create_user("banned", "banned@example.com")
 
-    def test_good_public(self):
-        """
-        Tests that public rooms can be accessed by users regardless of whether or not
-        they are logged in.
-        """
-        self.assertEqual(
-            (self.room, RoomAccessStatus.ALLOWED),
-            Room.objects.get_access_status(
-                self.room.number, AnonymousUser(), "guest_other"
-            ),
+        cls.public_room = Room.objects.create(
+            name="Room", number="1234567890", owner=cls.owner
         )
-        self.assertEqual(
-            (self.room, RoomAccessStatus.ALLOWED),
-            Room.objects.get_access_status(self.room.number, self.other_user, "test"),
+        cls.confirmed_room = Room.objects.create(
+            name="Room",
+            number="2345678901",
+            owner=cls.owner,
+            access_type=Room.AccessTypes.CONFIRMED,
         )
-
-    def test_good_confirmed(self):
-        """
-        Tests that confirmed-only rooms can be accessed by logged in users.
-        """
-        self.room.access_type = Room.AccessTypes.CONFIRMED
-        self.room.save()
-
-        self.assertEqual(
-            (self.room, RoomAccessStatus.ALLOWED),
-            Room.objects.get_access_status(
-                self.room.number, self.other_user, self.other_user.username
-            ),
+        cls.confirmed_room.banned_users.add(cls.banned_user)
+        cls.private_room = Room.objects.create(
+            name="Room",
+            number="3456789012",
+            owner=cls.owner,
+            access_type=Room.AccessTypes.PRIVATE,
         )
-
-    def test_good_private(self):
-        """
-        Tests that private rooms can be accessed by invited users.
-        """
-        self.room.access_type = Room.AccessTypes.PRIVATE
-        self.room.invited_users.add(self.other_user)
-        self.room.save()
-
-        self.assertEqual(
-            (self.room, RoomAccessStatus.ALLOWED),
-            Room.objects.get_access_status(
-                self.room.number, self.other_user, self.other_user.username
+        cls.private_room.invited_users.add(cls.other_user)
+
+    def test_get_access_status(self):
+        """
+        Tests the access status returned for each combination of room, user, and
+        username.
+        """
+        anonymous_user = AnonymousUser()
+        cases = [
+            # Public rooms can be accessed by users regardless of whether or not they
+            # are logged in.
+            (self.public_room, anonymous_user, "guest_other", RoomAccessStatus.ALLOWED),
+            (self.public_room, self.other_user, "test", RoomAccessStatus.ALLOWED),
+            # Confirmed-only rooms can be accessed by logged in users.
+            (self.confirmed_room, self.other_user, "test", RoomAccessStatus.ALLOWED),
+            # Private rooms can be accessed by invited users.
+            (self.private_room, self.other_user, "test", RoomAccessStatus.ALLOWED),
+            # Bad usernames are only rejected for users who are not logged in.
+            (self.public_room, anonymous_user, "", RoomAccessStatus.BAD_USERNAME),
+            (self.public_room, anonymous_user, " ", RoomAccessStatus.BAD_USERNAME),
+            (self.public_room, self.other_user, "", RoomAccessStatus.ALLOWED),
+            (self.public_room, self.other_user, " ", RoomAccessStatus.ALLOWED),
+            # Users who are not logged in can't access confirmed-only rooms.
+            (
+                self.confirmed_room,
+                anonymous_user,
+                "guest_test",
+                RoomAccessStatus.CONFIRM_REQUIRED,
             ),
-        )
+            # Users who are not invited can't access private rooms.
+            (
+                self.private_room,
+                anonymous_user,
+                "guest_test",
+                RoomAccessStatus.NOT_INVITED,
+            ),
+            (
+                self.private_room,
+                self.banned_user,
+                "banned",
+                RoomAccessStatus.NOT_INVITED,
+            ),
+            # Banned users can't access rooms.
+            (self.confirmed_room, self.banned_user, "banned", RoomAccessStatus.BANNED),
+        ]
+        for room, user, username, access_status in cases:
+            with self.subTest(room=room.number, user=user, username=username):
+                self.assertEqual(
+                    (room, access_status),
+                    Room.objects.get_access_status(room.number, user, username),
+                )
 
     def test_not_found(self):
         """
@@ -82,73 +130,3 @@ class RoomAccessTests(TestCase):
             (None, RoomAccessStatus.NOT_FOUND),
             Room.objects.get_access_status("0987654321", AnonymousUser(), "guest_test"),
         )
-
-    def test_bad_username(self):
-        """
-        Tests that BAD_USERNAME will be returned for bad usernames. Also tests that
-        users who are logged in won't receive BAD_USERNAME regardless of username.
-        """
-        self.assertEqual(
-            (self.room, RoomAccessStatus.BAD_USERNAME),
-            Room.objects.get_access_status(self.room.number, AnonymousUser(), ""),
-        )
-        self.assertEqual(
-            (self.room, RoomAccessStatus.BAD_USERNAME),
-            Room.objects.get_access_status(self.room.number, AnonymousUser(), " "),
-        )
-
-        # When logged in, get_access_status won't return BAD_USERNAME.
-        self.assertEqual(
-            (self.room, RoomAccessStatus.ALLOWED),
-            Room.objects.get_access_status(self.room.number, self.other_user, ""),
-        )
-        self.assertEqual(
-            (self.room, RoomAccessStatus.ALLOWED),
-            Room.objects.get_access_status(self.room.number, self.other_user, " "),
-        )
-
-    def test_confirm_required(self):
-        """
-        Tests that users who are not logged in will receive CONFIRM_REQUIRED for
-        confirmed-only rooms.
-        """
-        self.room.access_type = Room.AccessTypes.CONFIRMED
-        self.room.save()
-
-        self.assertEqual(
-            (self.room, RoomAccessStatus.CONFIRM_REQUIRED),
-            Room.objects.get_access_status(
-                self.room.number, AnonymousUser(), "guest_test"
-            ),
-        )
-
-    def test_not_invited(self):
-        """
-        Tests that users who are not invited to private rooms will receive NOT_INVITED.
-        """
-        self.room.access_type = Room.AccessTypes.PRIVATE
-        self.room.save()
-
-        self.assertEqual(
-            (self.room, RoomAccessStatus.NOT_INVITED),
-            Room.objects.get_access_status(
-                self.room.number, AnonymousUser(), "guest_test"
-            ),
-        )
-        self.assertEqual(
-            (self.room, RoomAccessStatus.NOT_INVITED),
-            Room.objects.get_access_status(self.room.number, self.other_user, "test"),
-        )
-
-    def test_banned(self):
-        """
-        Tests that users banned from confirmed-only will receive BANNED.
-        """
-        self.room.access_type = Room.AccessTypes.CONFIRMED
-        self.room.banned_users.add(self.other_user)
-        self.room.save()
-
-        self.assertEqual(
-            (self.room, RoomAccessStatus.BANNED),
-            Room.objects.get_access_status(self.room.number, self.other_user, "test"),
-        )
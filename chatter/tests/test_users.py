@@ -1,35 +1,69 @@
 from django.contrib.auth import get_user, get_user_model
+from django.contrib.auth import views as auth_views
+from django.db import transaction
 from django.db.utils import IntegrityError
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
 
+from chatter.views import RegisterView
 
+# Passwords are hashed with MD5, since the default hasher is deliberately slow and these
+# tests don't need the hashes to be secure.
+FAST_PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+User = get_user_model()
+
+
+@override_settings(PASSWORD_HASHERS=FAST_PASSWORD_HASHERS)
 class UserCreationTests(TestCase):
-    user_model = get_user_model()
-    user_manager = user_model.objects
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("test", "test@example.com", "12345")
+        cls.superuser = User.objects.create_superuser(
+            "super", "super@example.com", "12345"
+        )
 
     def test_create_user(self):
-        user = self.user_model.objects.create_user("test", "test@example.com", "12345")
-        self.assertEqual(user.username, "test")
-        self.assertEqual(user.email, "test@example.com")
-        self.assertTrue(user.is_active)
-        self.assertFalse(user.is_superuser)
+        self.assertEqual(self.user.username, "test")
+        self.assertEqual(self.user.email, "test@example.com")
+        self.assertTrue(self.user.is_active)
+        self.assertFalse(self.user.is_superuser)
 
-        with self.assertRaises(IntegrityError):
-            self.user_model.objects.create_user("test", "whatever@example.com", "67890")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user("test", "whatever@example.com", "67890")
 
     def test_create_superuser(self):
-        user = self.user_model.objects.create_superuser(
-            "test", "test@example.com", "12345"
-        )
-        self.assertEqual(user.username, "test")
-        self.assertEqual(user.email, "test@example.com")
-        self.assertTrue(user.is_active)
-        self.assertTrue(user.is_superuser)
+        self.assertEqual(self.superuser.username, "super")
+        self.assertEqual(self.superuser.email, "super@example.com")
+        self.assertTrue(self.superuser.is_active)
+        self.assertTrue(self.superuser.is_superuser)
 
-        with self.assertRaises(IntegrityError):
-            self.user_model.objects.create_user("test", "whatever@example.com", "67890")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user("super", "whatever@example.com", "67890")
 
 
+class UserRoutingTests(SimpleTestCase):
+    """
+    Tests that account URLs are routed to the right views. These don't need the
+    database.
+    """
+
+    def test_routes(self):
+        routes = [
+            ("/login/", auth_views.LoginView),
+            ("/logout/", auth_views.LogoutView),
+            ("/register/", RegisterView),
+        ]
+        for path, view_class in routes:
+            with self.subTest(path=path):
+                self.assertIs(view_class, resolve(path).func.view_class)
+
+
+# Sessions are kept in signed cookies so that logging in doesn't write to the database.
+@override_settings(
+    PASSWORD_HASHERS=FAST_PASSWORD_HASHERS,
+    SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies",
+)
 class UserLoginTests(TestCase):
     credentials = {
         "username": "test",
@@ -37,12 +71,43 @@ class UserLoginTests(TestCase):
         "password": "uQygs8HXqq",
     }
 
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            "existing", "existing@example.com", cls.credentials["password"]
+        )
+
     def test_login(self):
         """
-        Tests user login.
+        Tests user login through the login form.
+        """
+        credentials = {"username": "existing", "password": self.credentials["password"]}
+        # Looking up the user and updating their last login.
+        with self.assertNumQueries(2):
+            response = self.client.post("/login/", credentials)
+        self.assertRedirects(response, "/", fetch_redirect_response=False)
+        self.assertTrue(get_user(self.client).is_authenticated)
+
+    def test_index_logged_in(self):
+        """
+        Tests that logged in users can view the index page. Logs in without the login
+        form so that the password doesn't have to be checked.
+        """
+        self.client.force_login(self.user)
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_user(self.client), self.user)
+        # Page shows who is logged in, so it must not be cached for other users.
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotIn("max-age", response["Cache-Control"])
+
+    def test_index_anonymous(self):
+        """
+        Tests that the index page is cached for visitors without cookies.
         """
-        response = self.client.post("/login/", self.credentials, follow=True)
+        response = self.client.get("/")
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "max-age=60")
 
     def test_register(self):
         """
@@ -55,7 +120,11 @@ class UserLoginTests(TestCase):
             "password1": self.credentials["password"],
             "password2": self.credentials["password"],
         }
-        response = self.client.post("/register/", data, follow=True)
+        # Checking the username, inserting the user, and updating their last login. The
+        # redirect is followed (loading the user again) so that the welcome message on
+        # the index page can be checked.
+        with self.assertNumQueries(4):
+            response = self.client.post("/register/", data, follow=True)
         user = get_user(self.client)
         self.assertTrue(user.is_authenticated)
         self.assertContains(response, f"You are now registered, {data['username']}")
@@ -1,10 +1,10 @@
 from django.contrib.auth import views as auth_views
 from django.urls import path
 
-from chatter.views import IndexView, RegisterView
+from chatter.views import RegisterView, index
 
 urlpatterns = [
-    path("", IndexView.as_view(template_name="chatter/index.html"), name="index"),
+    path("", index, name="index"),
     path(
         "login/",
         auth_views.LoginView.as_view(
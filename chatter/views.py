@@ -1,20 +1,50 @@
 from django.contrib.auth import login
-from django.views.generic import CreateView, TemplateView
+from django.shortcuts import render
+from django.urls import reverse_lazy
+from django.utils.cache import patch_cache_control
+from django.utils.text import format_lazy
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_safe
+from django.views.decorators.vary import vary_on_cookie
+from django.views.generic import CreateView
 
 from chatter.forms import RegisterForm
 
+# Query string parameter that tells the index page that the user just registered.
+NEW_USER_PARAMETER = "new_user"
 
-class IndexView(TemplateView):
-    def get_context_data(self, **kwargs):
-        if self.request.GET.get("new_user"):
-            kwargs["new_user"] = True
-        return kwargs
+
+def _render_index(request):
+    return render(
+        request,
+        "chatter/index.html",
+        {"new_user": NEW_USER_PARAMETER in request.GET},
+    )
+
+
+# Visitors without cookies can't be logged in, so they all get the same page, which is
+# cached for a short time. Varying on cookies keeps the cached page from being served
+# to anyone who sends cookies.
+_cached_index = cache_page(60)(vary_on_cookie(_render_index))
+
+
+@require_safe
+def index(request):
+    """
+    Shows the index page. The page is only cached for visitors without cookies.
+    """
+    if not request.COOKIES:
+        return _cached_index(request)
+    response = _render_index(request)
+    # Page may show who is logged in, so it mustn't be stored by shared caches.
+    patch_cache_control(response, private=True)
+    return response
 
 
 class RegisterView(CreateView):
     form_class = RegisterForm
     template_name = "chatter/register.html"
-    success_url = "/?new_user=1"
+    success_url = format_lazy("{}?{}=1", reverse_lazy("index"), NEW_USER_PARAMETER)
 
     def form_valid(self, form):
         response = super().form_valid(form)
@@ -89,9 +89,19 @@ DATABASES = {
         "PASSWORD": config("DB_PASSWORD"),
         "HOST": config("DB_HOST", default="127.0.0.1"),
         "PORT": config("DB_PORT", default="5432"),
+        # Keeps connections open between requests and consumer database calls instead
+        # of opening a new one every time.
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", cast=int, default=600),
+        # Server settings for each connection, such as "-c synchronous_commit=off" to
+        # avoid waiting on disk flushes when running tests.
+        "OPTIONS": {"options": config("DB_OPTIONS", default="")},
     }
 }
 
+# Number of threads that the chat consumer runs database work on. Each thread keeps its
+# own database connection.
+DB_EXECUTOR_MAX_WORKERS = config("DB_EXECUTOR_MAX_WORKERS", cast=int, default=4)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -136,19 +146,32 @@ STATIC_URL = "/static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {
-            "hosts": [
-                (
-                    config("REDIS_HOST", default="127.0.0.1"),
-                    config("REDIS_PORT", cast=int, default=6379),
-                )
-            ],
+# The in-memory channel layer avoids a trip to Redis for every group operation, but it
+# only works when everything runs in a single process (such as during development).
+if config("IN_MEMORY_CHANNEL_LAYER", cast=bool, default=False):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
         },
-    },
-}
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "chatter.layers.PipelinedRedisChannelLayer",
+            "CONFIG": {
+                "hosts": [
+                    (
+                        config("REDIS_HOST", default="127.0.0.1"),
+                        config("REDIS_PORT", cast=int, default=6379),
+                    )
+                ],
+                # Allows more messages to be queued for busy rooms, and discards
+                # undelivered messages sooner.
+                "capacity": 1500,
+                "expiry": 10,
+            },
+        },
+    }
 
 CRISPY_TEMPLATE_PACK = "bootstrap4"
 